@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Output Sinks
+Destinations for generated drawings: a plain directory, a single zip or tar
+archive, or a SQLite blob store. Writes are buffered in memory and flushed in
+batches, and every sink records an index of part names to entry names.
+"""
+
+import io
+import json
+import time
+import sqlite3
+import tarfile
+import zipfile
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+INDEX_ENTRY_NAME = "index.json"
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class OutputSink:
+    """
+    Base class for drawing output destinations
+
+    Subclasses implement _write_entries() and may override _write_index()
+    and _close(). Use as a context manager so pending entries and the index
+    are flushed on exit. If the block raises, the entries written so far are
+    kept but no index is written; every sink starts from an empty destination,
+    so a missing index reliably marks an incomplete run.
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """Initialize the sink with an in-memory write buffer of buffer_size bytes"""
+        self.buffer_size = buffer_size
+        self.index: Dict[str, List[str]] = {}
+        self._pending: List[Tuple[str, str, bytes]] = []
+        self._pending_bytes = 0
+        self._entry_names = {INDEX_ENTRY_NAME}
+        self._closed = False
+
+    def write(self, part_name: str, entry_name: str, data: bytes):
+        """Queue an entry for part_name, flushing once the buffer is full"""
+        if self._closed:
+            raise ValueError("Cannot write to a closed output sink")
+        if entry_name in self._entry_names:
+            raise ValueError(f"Duplicate entry name in output sink: {entry_name}")
+        self._entry_names.add(entry_name)
+
+        self._pending.append((part_name, entry_name, data))
+        self._pending_bytes += len(data)
+        self.index.setdefault(part_name, []).append(entry_name)
+
+        if self._pending_bytes >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write all pending entries to the underlying storage"""
+        if not self._pending:
+            return
+
+        logger.info(f"Flushing {len(self._pending)} entries ({self._pending_bytes} bytes)")
+        self._write_entries(self._pending)
+        self._pending = []
+        self._pending_bytes = 0
+
+    def close(self):
+        """Flush pending entries, write the index and release the storage"""
+        if self._closed:
+            return
+
+        self.flush()
+        self._write_index()
+        self._close()
+        self._closed = True
+
+    def abort(self):
+        """Flush pending entries and release the storage without writing the index"""
+        if self._closed:
+            return
+
+        try:
+            self.flush()
+        finally:
+            self._close()
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _index_bytes(self) -> bytes:
+        """Serialize the part index as JSON"""
+        return json.dumps(self.index, indent=2, sort_keys=True).encode('utf-8')
+
+    def _write_entries(self, entries: List[Tuple[str, str, bytes]]):
+        raise NotImplementedError
+
+    def _write_index(self):
+        self._write_entries([("", INDEX_ENTRY_NAME, self._index_bytes())])
+
+    def _close(self):
+        pass
+
+
+class DirectorySink(OutputSink):
+    """
+    Writes each entry as a loose file in a directory
+
+    Files from earlier runs are left in place, but their index.json is removed
+    on open, so only the new run's index describes the directory.
+    """
+
+    def __init__(self, output_dir: Path, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.output_dir = output_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stale_index = self.output_dir / INDEX_ENTRY_NAME
+        if stale_index.exists():
+            stale_index.unlink()
+
+    def _write_entries(self, entries: List[Tuple[str, str, bytes]]):
+        for _, entry_name, data in entries:
+            entry_path = self.output_dir / entry_name
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            entry_path.write_bytes(data)
+
+
+class ZipSink(OutputSink):
+    """Streams entries into a single zip archive"""
+
+    def __init__(
+        self,
+        archive_path: Path,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        compression: int = zipfile.ZIP_DEFLATED
+    ):
+        super().__init__(buffer_size)
+        self.archive_path = archive_path
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(archive_path, 'wb', buffering=buffer_size)
+        self._archive = zipfile.ZipFile(self._file, mode='w', compression=compression)
+
+    def _write_entries(self, entries: List[Tuple[str, str, bytes]]):
+        for _, entry_name, data in entries:
+            self._archive.writestr(entry_name, data)
+
+    def _close(self):
+        self._archive.close()
+        self._file.close()
+
+
+class TarSink(OutputSink):
+    """Streams entries into a single tar archive, gzip-compressed for .tar.gz/.tgz"""
+
+    def __init__(self, archive_path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.archive_path = archive_path
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        compressed = archive_path.name.lower().endswith(('.tar.gz', '.tgz'))
+        self._file = open(archive_path, 'wb', buffering=buffer_size)
+        self._archive = tarfile.open(fileobj=self._file, mode='w:gz' if compressed else 'w')
+
+    def _write_entries(self, entries: List[Tuple[str, str, bytes]]):
+        now = time.time()
+        for _, entry_name, data in entries:
+            info = tarfile.TarInfo(name=entry_name)
+            info.size = len(data)
+            info.mtime = now
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def _close(self):
+        self._archive.close()
+        self._file.close()
+
+
+class SQLiteSink(OutputSink):
+    """
+    Stores entries as blobs in a SQLite database, one transaction per flush
+
+    Existing entries are cleared on open, like the archive sinks truncating
+    their file. The part_name column indexes the entries; the JSON index is
+    stored in the meta table only when the run completes.
+    """
+
+    def __init__(self, db_path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(db_path))
+        with self._connection:
+            self._connection.execute("DROP TABLE IF EXISTS entries")
+            self._connection.execute("DROP TABLE IF EXISTS meta")
+            self._connection.execute(
+                "CREATE TABLE entries ("
+                "name TEXT PRIMARY KEY, part_name TEXT NOT NULL, data BLOB NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX entries_part_name ON entries (part_name)"
+            )
+            self._connection.execute(
+                "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def _write_entries(self, entries: List[Tuple[str, str, bytes]]):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO entries (part_name, name, data) VALUES (?, ?, ?)",
+                entries
+            )
+
+    def _write_index(self):
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                ("index", self._index_bytes().decode('utf-8'))
+            )
+
+    def _close(self):
+        self._connection.close()
+
+
+def open_output_sink(path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE) -> OutputSink:
+    """
+    Open the sink matching a path's suffix
+
+    .zip -> ZipSink, .tar/.tar.gz/.tgz -> TarSink, .sqlite/.sqlite3/.db -> SQLiteSink,
+    anything else is treated as a directory.
+    """
+    name = path.name.lower()
+    if name.endswith('.zip'):
+        return ZipSink(path, buffer_size)
+    if name.endswith(('.tar', '.tar.gz', '.tgz')):
+        return TarSink(path, buffer_size)
+    if name.endswith(('.sqlite', '.sqlite3', '.db')):
+        return SQLiteSink(path, buffer_size)
+    return DirectorySink(path, buffer_size)
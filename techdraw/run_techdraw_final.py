@@ -15,6 +15,14 @@ STEP_FILE_PATH = os.path.join(script_dir, "input", step_file_name)
 OUTPUT_SVG_PATH = os.path.join(script_dir, "output", output_svg_name)
 TEMPLATE_PATH = os.path.join(script_dir, "templates", template_name)
 
+# --- Render Configuration ---
+PREVIEW_MODE = False # Coarse edges, no hole annotation, dimensions or template
+EDGE_SAMPLES = 20 # Points per edge when tessellating for the SVG paths
+BREP_CACHE_PATH = None # Optional .brep file caching the imported STEP geometry
+BREP_CACHE_WRITE = True # Write the cache on a miss; False only reads an existing cache
+SVG_BEGIN_MARKER = None # Set by the generator; SVG goes to stdout between the markers
+SVG_END_MARKER = None    # when OUTPUT_SVG_PATH is empty
+
 # --- Hole Detection Configuration ---
 MIN_HOLE_RADIUS = 0.5
 MAX_HOLE_RADIUS = 50
@@ -25,7 +33,7 @@ SHOW_RADIUS_DIMENSIONS = True
 if not os.path.exists(STEP_FILE_PATH):
     print(f"Error: STEP file not found at '{STEP_FILE_PATH}'")
     sys.exit(1)
-if not os.path.exists(TEMPLATE_PATH):
+if not PREVIEW_MODE and not os.path.exists(TEMPLATE_PATH):
     print(f"Error: Template file not found at '{TEMPLATE_PATH}'")
     sys.exit(1)
 
@@ -35,10 +43,10 @@ def project_point(point, direction):
     elif direction == "right": return (-point.y, point.z) # Looking from the right
     return (point.x, point.y)
 
-def create_svg_path_from_edges(edges, direction, scale, offset_x, offset_y):
+def create_svg_path_from_edges(edges, direction, scale, offset_x, offset_y, samples=20):
     path_data_list = []
     for edge in edges:
-        points = edge.discretize(20)
+        points = edge.discretize(samples)
         path_data = "M " + " L ".join(f"{project_point(p, direction)[0] * scale + offset_x:.3f},{-(project_point(p, direction)[1] * scale) + offset_y:.3f}" for p in points)
         path_data_list.append(path_data)
     return path_data_list
@@ -214,31 +222,62 @@ def add_radius_dimension(svg_group, hole_info, view_info, scale, offset_x, offse
 # --- Main Script ---
 doc = FreeCAD.newDocument("TechDrawFinal")
 shape = Part.Shape()
-shape.read(STEP_FILE_PATH)
+cache_hit = False
+if BREP_CACHE_PATH and os.path.exists(BREP_CACHE_PATH):
+    try:
+        shape.read(BREP_CACHE_PATH)
+        cache_hit = not shape.isNull()
+    except Exception as e:
+        print(f"Warning: could not read geometry cache, using STEP file: {e}")
+    if cache_hit:
+        print(f"Geometry loaded from cache: {BREP_CACHE_PATH}")
+    else:
+        shape = Part.Shape()
+if not cache_hit:
+    shape.read(STEP_FILE_PATH)
+    if BREP_CACHE_PATH and BREP_CACHE_WRITE:
+        # Export under a private name and rename, so concurrent runs never read a partial file
+        temp_cache_path = f"{os.path.splitext(BREP_CACHE_PATH)[0]}.{os.getpid()}.tmp.brep"
+        try:
+            shape.exportBrep(temp_cache_path)
+            os.replace(temp_cache_path, BREP_CACHE_PATH)
+            print(f"Geometry cached to: {BREP_CACHE_PATH}")
+        except Exception as e:
+            print(f"Warning: could not cache geometry: {e}")
+            if os.path.exists(temp_cache_path):
+                os.remove(temp_cache_path)
 part_object = doc.addObject("Part::Feature", "Imported_STEP")
 part_object.Shape = shape
 doc.recompute()
 print("STEP file imported successfully.")
 
 # Detect circular holes
-print("Detecting circular holes...")
-holes = detect_circular_holes(shape, min_radius=MIN_HOLE_RADIUS, max_radius=MAX_HOLE_RADIUS)
-print(f"Found {len(holes)} circular holes")
+if PREVIEW_MODE:
+    holes = []
+else:
+    print("Detecting circular holes...")
+    holes = detect_circular_holes(shape, min_radius=MIN_HOLE_RADIUS, max_radius=MAX_HOLE_RADIUS)
+    print(f"Found {len(holes)} circular holes")
 
-# Load SVG template
-print(f"Loading template: {TEMPLATE_PATH}")
 ET.register_namespace('', "http://www.w3.org/2000/svg")
-tree = ET.parse(TEMPLATE_PATH)
-root = tree.getroot()
-
-# Find or create defs section and add arrowhead marker
-ns = {'svg': 'http://www.w3.org/2000/svg'}
-defs = root.find('svg:defs', ns)
-if defs is None:
-    defs = ET.SubElement(root, 'defs')
-arrow_marker = ET.Element('marker', {'id': 'arrowhead', 'viewBox': '0 0 10 10', 'refX': '5', 'refY': '5', 'markerWidth': '6', 'markerHeight': '6', 'orient': 'auto-start-reverse'})
-ET.SubElement(arrow_marker, 'path', {'d': 'M 0 0 L 10 5 L 0 10 z', 'fill': 'black'})
-defs.append(arrow_marker)
+if PREVIEW_MODE:
+    # Bare A4 landscape sheet, same coordinate system as the template
+    root = ET.Element('{http://www.w3.org/2000/svg}svg', {'width': '297mm', 'height': '210mm', 'viewBox': '0 0 297 210'})
+    tree = ET.ElementTree(root)
+else:
+    # Load SVG template
+    print(f"Loading template: {TEMPLATE_PATH}")
+    tree = ET.parse(TEMPLATE_PATH)
+    root = tree.getroot()
+
+    # Find or create defs section and add arrowhead marker
+    ns = {'svg': 'http://www.w3.org/2000/svg'}
+    defs = root.find('svg:defs', ns)
+    if defs is None:
+        defs = ET.SubElement(root, 'defs')
+    arrow_marker = ET.Element('marker', {'id': 'arrowhead', 'viewBox': '0 0 10 10', 'refX': '5', 'refY': '5', 'markerWidth': '6', 'markerHeight': '6', 'orient': 'auto-start-reverse'})
+    ET.SubElement(arrow_marker, 'path', {'d': 'M 0 0 L 10 5 L 0 10 z', 'fill': 'black'})
+    defs.append(arrow_marker)
 
 # Create a group for our drawings
 drawing_group = ET.SubElement(root, 'g', id='TechDrawViews')
@@ -305,7 +344,7 @@ for name, view in views.items():
     # we must offset by the *highest* projected Y value.
     trans_y = view['pos'][1] + projected_max_y * scale
 
-    paths = create_svg_path_from_edges(shape.Edges, view['dir'], scale, trans_x, trans_y)
+    paths = create_svg_path_from_edges(shape.Edges, view['dir'], scale, trans_x, trans_y, samples=EDGE_SAMPLES)
     for path_data in paths:
         ET.SubElement(view_group, 'path', d=path_data)
 
@@ -317,28 +356,34 @@ for name, view in views.items():
             if SHOW_RADIUS_DIMENSIONS:
                 add_radius_dimension(view_group, hole, view, scale, trans_x, trans_y)
 
-# --- Add Optimized Dimensions ---
-print("Adding optimized dimensions...")
-
-# Re-access positions from the views dictionary for clarity
-front_view_pos = views['front']['pos']
-right_view_pos = views['right']['pos']
-
-# Front View: Length (bottom) and Height (left)
-p_front_bl = (front_view_pos[0], front_view_pos[1] + height * scale) # bottom-left
-p_front_br = (front_view_pos[0] + length * scale, front_view_pos[1] + height * scale) # bottom-right
-p_front_tl = (front_view_pos[0], front_view_pos[1]) # top-left
-add_dimension(drawing_group, p_front_bl, p_front_br, f"{length:.0f}", position='bottom')
-add_dimension(drawing_group, p_front_tl, p_front_bl, f"{height:.0f}", position='left')
-
-# Right View: Width (bottom)
-p_right_bl = (right_view_pos[0], right_view_pos[1] + height * scale) # bottom-left
-p_right_br = (right_view_pos[0] + width * scale, right_view_pos[1] + height * scale) # bottom-right
-add_dimension(drawing_group, p_right_bl, p_right_br, f"{width:.0f}", position='bottom')
-
-# Write the final SVG file
-print(f"Writing final SVG to: {OUTPUT_SVG_PATH}")
-tree.write(OUTPUT_SVG_PATH, encoding='utf-8', xml_declaration=True)
+if not PREVIEW_MODE:
+    # --- Add Optimized Dimensions ---
+    print("Adding optimized dimensions...")
+
+    # Re-access positions from the views dictionary for clarity
+    front_view_pos = views['front']['pos']
+    right_view_pos = views['right']['pos']
+
+    # Front View: Length (bottom) and Height (left)
+    p_front_bl = (front_view_pos[0], front_view_pos[1] + height * scale) # bottom-left
+    p_front_br = (front_view_pos[0] + length * scale, front_view_pos[1] + height * scale) # bottom-right
+    p_front_tl = (front_view_pos[0], front_view_pos[1]) # top-left
+    add_dimension(drawing_group, p_front_bl, p_front_br, f"{length:.0f}", position='bottom')
+    add_dimension(drawing_group, p_front_tl, p_front_bl, f"{height:.0f}", position='left')
+
+    # Right View: Width (bottom)
+    p_right_bl = (right_view_pos[0], right_view_pos[1] + height * scale) # bottom-left
+    p_right_br = (right_view_pos[0] + width * scale, right_view_pos[1] + height * scale) # bottom-right
+    add_dimension(drawing_group, p_right_bl, p_right_br, f"{width:.0f}", position='bottom')
+
+# Write the final SVG file, or hand it back on stdout when no path is configured
+if OUTPUT_SVG_PATH:
+    print(f"Writing final SVG to: {OUTPUT_SVG_PATH}")
+    tree.write(OUTPUT_SVG_PATH, encoding='utf-8', xml_declaration=True)
+else:
+    print(SVG_BEGIN_MARKER)
+    print(ET.tostring(root, encoding='unicode'))
+    print(SVG_END_MARKER)
 
 print("\nProcess completed successfully!")
 FreeCAD.closeDocument(doc.Name)
@@ -6,17 +6,37 @@ Based on: https://github.com/annguyenphanhuu/techdraw.git
 """
 
 import os
+import re
 import sys
+import hashlib
 import subprocess
 import tempfile
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List
 from datetime import datetime
 
+from output_sinks import OutputSink, open_output_sink
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Delimit the SVG the FreeCAD script prints to stdout when no output path is set
+SVG_BEGIN_MARKER = "===TECHDRAW_SVG_BEGIN==="
+SVG_END_MARKER = "===TECHDRAW_SVG_END==="
+
+# Runs the job script piped on stdin, so no script file is written per job. The
+# marker confirms that freecadcmd passed stdin through and that print() reaches stdout.
+BOOTSTRAP_MARKER = "===TECHDRAW_BOOTSTRAP_OK==="
+FREECAD_STDIN_BOOTSTRAP = (
+    "import sys; "
+    "src = sys.stdin.read(); "
+    "src.strip() or sys.exit(3); "
+    f"print('{BOOTSTRAP_MARKER}', flush=True); "
+    "exec(compile(src, 'run_techdraw_final.py', 'exec'), {'__name__': '__main__'})"
+)
+
 class TechnicalDrawingGenerator:
     """
     Generates technical drawings from STEP files using the cloned techdraw repository
@@ -29,10 +49,21 @@ class TechnicalDrawingGenerator:
         self.templates_dir = self.techdraw_dir / "templates"
         self.temp_output_dir = self.techdraw_dir / "temp_output"
         self.base_script_path = self.techdraw_dir / "run_techdraw_final.py"
+        self.geometry_cache_dir = self.temp_output_dir / "geometry_cache"
         self.template_name = "A4_TOLERY.svg"
+        self.freecad_command = "freecadcmd"
+        # None until the stdin bootstrap has been tried against this freecadcmd
+        self._stdin_bootstrap_supported: Optional[bool] = None
+
+        # Preview settings: coarse edge tessellation and a small PNG raster
+        self.preview_edge_samples = 4
+        self.preview_png_width = 800
+        self.preview_cache_size = 64
+        self._preview_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
 
         # Ensure directories exist
         self.temp_output_dir.mkdir(parents=True, exist_ok=True)
+        self.geometry_cache_dir.mkdir(parents=True, exist_ok=True)
 
         logger.info(f"Technical drawing directory: {self.techdraw_dir}")
         logger.info(f"Templates directory: {self.templates_dir}")
@@ -57,7 +88,8 @@ class TechnicalDrawingGenerator:
         self, 
         step_file_path: Path, 
         output_dir: Path,
-        base_filename: str = None
+        base_filename: str = None,
+        cache_geometry: bool = False
     ) -> Tuple[bool, Optional[Path], Optional[Path], str]:
         """
         Generate technical drawing from STEP file
@@ -66,6 +98,8 @@ class TechnicalDrawingGenerator:
             step_file_path: Path to input STEP file
             output_dir: Directory to save output files
             base_filename: Base name for output files (without extension)
+            cache_geometry: Read and populate the BREP geometry cache, e.g. for a
+                background run following a preview of the same file
             
         Returns:
             Tuple of (success, svg_path, pdf_path, message)
@@ -86,7 +120,7 @@ class TechnicalDrawingGenerator:
             
             # Generate SVG using FreeCAD
             success, svg_path, message = self._generate_svg_with_freecad(
-                step_file_path, svg_output_path
+                step_file_path, svg_output_path, cache_geometry=cache_geometry
             )
             
             if not success:
@@ -104,10 +138,63 @@ class TechnicalDrawingGenerator:
             logger.error(f"Error generating technical drawing: {e}")
             return False, None, None, f"Technical drawing generation failed: {str(e)}"
     
+    def generate_technical_drawing_to_sink(
+        self,
+        step_file_path: Path,
+        sink: OutputSink,
+        part_name: str = None,
+        base_filename: str = None,
+        cache_geometry: bool = False
+    ) -> Tuple[bool, str]:
+        """
+        Generate technical drawing from STEP file and write it to an output sink
+        
+        The SVG and PDF are produced in memory and handed to the sink, so no
+        files are created per part unless cache_geometry is set.
+        
+        Args:
+            step_file_path: Path to input STEP file
+            sink: Destination for the SVG and PDF entries
+            part_name: Name of the part in the sink index (defaults to the file stem)
+            base_filename: Base name for output entries (defaults to part_name + "_technical")
+            cache_geometry: Read and populate the BREP geometry cache
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            if not step_file_path.exists():
+                return False, f"STEP file not found: {step_file_path}"
+            
+            if part_name is None:
+                part_name = step_file_path.stem
+            if base_filename is None:
+                base_filename = part_name + "_technical"
+            
+            success, svg_bytes, message = self._generate_svg_bytes(
+                step_file_path, cache_geometry=cache_geometry
+            )
+            if not success:
+                return False, message
+            
+            sink.write(part_name, f"{base_filename}.svg", svg_bytes)
+            
+            pdf_success, pdf_bytes, pdf_message = self._convert_svg_bytes_to_pdf(svg_bytes)
+            if pdf_success:
+                sink.write(part_name, f"{base_filename}.pdf", pdf_bytes)
+                return True, "Technical drawing generated successfully"
+            else:
+                return True, f"SVG generated but PDF conversion failed: {pdf_message}"
+                
+        except Exception as e:
+            logger.error(f"Error generating technical drawing: {e}")
+            return False, f"Technical drawing generation failed: {str(e)}"
+    
     def _generate_svg_with_freecad(
         self, 
         step_file_path: Path, 
-        svg_output_path: Path
+        svg_output_path: Path,
+        cache_geometry: bool = False
     ) -> Tuple[bool, Optional[Path], str]:
         """Generate SVG using FreeCAD script"""
         
@@ -115,30 +202,14 @@ class TechnicalDrawingGenerator:
         logger.info(f"Target SVG output path: {svg_output_path}")
         
         # Create modified script content
-        script_content = self._create_modified_script(step_file_path, svg_output_path)
+        script_content = self._create_modified_script(
+            step_file_path,
+            svg_output_path,
+            brep_cache_path=self._geometry_cache_path(step_file_path) if cache_geometry else None
+        )
         
-        # Write script to temporary file
         try:
-            logger.info("Creating temporary script file...")
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-                f.write(script_content)
-                script_path = f.name
-            
-            # Execute FreeCAD script
-            logger.info(f"Executing FreeCAD script: {script_path}")
-            result = subprocess.run(
-                ["freecadcmd", script_path],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                timeout=120
-            )
-            
-            # Clean up script file
-            try:
-                os.unlink(script_path)
-            except:
-                pass
+            result = self._run_freecad_script(script_content, timeout=120)
             
             # Check results
             if result.returncode == 0 and svg_output_path.exists():
@@ -159,6 +230,212 @@ class TechnicalDrawingGenerator:
             logger.error(f"Error executing FreeCAD script: {e}")
             return False, None, f"Script execution error: {str(e)}"
     
+    def generate_preview(
+        self,
+        step_file_path: Path,
+        output_format: str = "svg"
+    ) -> Tuple[bool, Optional[bytes], str]:
+        """
+        Generate a fast, low-fidelity drawing preview in memory
+        
+        The preview uses coarse edge tessellation and skips hole annotation,
+        dimensions and the title block template. Nothing is written to the
+        output directory; imported geometry is cached and shared with full runs.
+        
+        Args:
+            step_file_path: Path to input STEP file
+            output_format: "svg" or "png"
+            
+        Returns:
+            Tuple of (success, image_bytes, message)
+        """
+        if output_format not in ("svg", "png"):
+            return False, None, f"Unsupported preview format: {output_format}"
+        
+        try:
+            if not step_file_path.exists():
+                return False, None, f"STEP file not found: {step_file_path}"
+            
+            cache_key = (self._geometry_cache_key(step_file_path), output_format)
+            cached = self._get_cached_preview(cache_key)
+            if cached is not None:
+                logger.info(f"Preview served from cache: {step_file_path}")
+                return True, cached, "Preview served from cache"
+            
+            svg_key = (cache_key[0], "svg")
+            svg_bytes = self._get_cached_preview(svg_key)
+            if svg_bytes is None:
+                success, svg_bytes, message = self._generate_svg_bytes(step_file_path, preview=True)
+                if not success:
+                    return False, None, message
+                self._cache_preview(svg_key, svg_bytes)
+            
+            if output_format == "svg":
+                return True, svg_bytes, "Preview generated successfully"
+            
+            success, png_bytes, message = self._convert_svg_bytes_to_png(svg_bytes)
+            if not success:
+                return False, None, message
+            self._cache_preview(cache_key, png_bytes)
+            return True, png_bytes, "Preview generated successfully"
+            
+        except Exception as e:
+            logger.error(f"Error generating preview: {e}")
+            return False, None, f"Preview generation failed: {str(e)}"
+    
+    def _generate_svg_bytes(
+        self,
+        step_file_path: Path,
+        preview: bool = False,
+        cache_geometry: bool = True
+    ) -> Tuple[bool, Optional[bytes], str]:
+        """Generate SVG with FreeCAD and read it back from stdout"""
+        
+        logger.info(f"Starting in-memory SVG generation for STEP file: {step_file_path}")
+        
+        script_content = self._create_modified_script(
+            step_file_path,
+            None,
+            brep_cache_path=self._geometry_cache_path(step_file_path) if cache_geometry else None,
+            preview=preview
+        )
+        
+        try:
+            result = self._run_freecad_script(script_content, timeout=60 if preview else 120)
+        except subprocess.TimeoutExpired:
+            return False, None, "FreeCAD script execution timeout"
+        except Exception as e:
+            logger.error(f"Error executing FreeCAD script: {e}")
+            return False, None, f"Script execution error: {str(e)}"
+        
+        svg_bytes = self._extract_svg_from_stdout(result.stdout)
+        if result.returncode != 0 or svg_bytes is None:
+            logger.error(f"FreeCAD script execution failed:")
+            logger.error(f"Return code: {result.returncode}")
+            logger.error(f"STDOUT: {result.stdout}")
+            logger.error(f"STDERR: {result.stderr}")
+            return False, None, f"FreeCAD execution failed: {result.stdout}"
+        
+        logger.info("SVG generated successfully")
+        return True, svg_bytes, "SVG generation completed"
+    
+    def _extract_svg_from_stdout(self, stdout: Optional[str]) -> Optional[bytes]:
+        """Extract the SVG printed between the stdout markers, or None if absent"""
+        match = re.search(
+            rf'{re.escape(SVG_BEGIN_MARKER)}\s*\n(.*?)\n\s*{re.escape(SVG_END_MARKER)}',
+            stdout or "",
+            flags=re.DOTALL
+        )
+        return match.group(1).encode('utf-8') if match else None
+    
+    def _get_cached_preview(self, key: Tuple[str, str]) -> Optional[bytes]:
+        """Look up a cached preview, marking it most recently used"""
+        data = self._preview_cache.get(key)
+        if data is not None:
+            self._preview_cache.move_to_end(key)
+        return data
+    
+    def _cache_preview(self, key: Tuple[str, str], data: bytes):
+        """Cache a preview, evicting the least recently used beyond preview_cache_size"""
+        self._preview_cache[key] = data
+        self._preview_cache.move_to_end(key)
+        while len(self._preview_cache) > self.preview_cache_size:
+            self._preview_cache.popitem(last=False)
+    
+    def _convert_svg_bytes_to_png(self, svg_bytes: bytes) -> Tuple[bool, Optional[bytes], str]:
+        """Rasterize SVG bytes to a small PNG in memory using cairosvg"""
+        try:
+            import cairosvg
+            
+            png_bytes = cairosvg.svg2png(
+                bytestring=svg_bytes,
+                output_width=self.preview_png_width,
+                background_color="white"
+            )
+            return True, png_bytes, "PNG conversion completed"
+            
+        except ImportError:
+            logger.warning("cairosvg not available, PNG preview not available")
+            return False, None, "PNG conversion requires cairosvg"
+        except Exception as e:
+            logger.error(f"Error in PNG conversion: {e}")
+            return False, None, f"PNG conversion error: {str(e)}"
+    
+    def _geometry_cache_key(self, step_file_path: Path) -> str:
+        """Cache key for a STEP file, invalidated when the file changes"""
+        stat = step_file_path.stat()
+        identity = f"{step_file_path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+    
+    def _geometry_cache_path(self, step_file_path: Path) -> Path:
+        """Location of the cached BREP geometry for a STEP file"""
+        return self.geometry_cache_dir / f"{self._geometry_cache_key(step_file_path)}.brep"
+    
+    def _run_freecad_script(self, script_content: str, timeout: int) -> subprocess.CompletedProcess:
+        """Run a FreeCAD script with freecadcmd and return the completed process
+        
+        The script is piped on stdin to a `freecadcmd -c` bootstrap. If the
+        bootstrap marker does not show up on stdout, this freecadcmd does not
+        support that, and the script is run from a temporary file instead.
+        """
+        if self._stdin_bootstrap_supported is not False:
+            logger.info("Executing FreeCAD script via stdin")
+            result = subprocess.run(
+                [self.freecad_command, "-c", FREECAD_STDIN_BOOTSTRAP],
+                input=script_content,
+                capture_output=True,
+                text=True,
+                encoding='utf-8',
+                timeout=timeout
+            )
+            if BOOTSTRAP_MARKER in (result.stdout or ""):
+                self._stdin_bootstrap_supported = True
+                return result
+            
+            logger.warning("freecadcmd did not run the script from stdin, falling back to a script file")
+            if self._stdin_bootstrap_supported is None:
+                self._stdin_bootstrap_supported = False
+        
+        return self._run_freecad_script_file(script_content, timeout)
+    
+    def _run_freecad_script_file(self, script_content: str, timeout: int) -> subprocess.CompletedProcess:
+        """Run a FreeCAD script from a temporary file and return the completed process"""
+        logger.info("Creating temporary script file...")
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
+            f.write(script_content)
+            script_path = f.name
+        
+        try:
+            logger.info(f"Executing FreeCAD script: {script_path}")
+            return subprocess.run(
+                [self.freecad_command, script_path],
+                capture_output=True,
+                text=True,
+                encoding='utf-8',
+                timeout=timeout
+            )
+        finally:
+            # Clean up script file
+            try:
+                os.unlink(script_path)
+            except OSError:
+                pass
+    
+    def _convert_svg_bytes_to_pdf(self, svg_bytes: bytes) -> Tuple[bool, Optional[bytes], str]:
+        """Convert SVG bytes to PDF bytes in memory using cairosvg"""
+        try:
+            import cairosvg
+            
+            pdf_bytes = cairosvg.svg2pdf(bytestring=svg_bytes)
+            return True, pdf_bytes, "PDF conversion completed"
+            
+        except ImportError:
+            logger.warning("cairosvg not available, in-memory PDF conversion not available")
+            return False, None, "PDF conversion requires cairosvg"
+        except Exception as e:
+            logger.error(f"Error in PDF conversion: {e}")
+            return False, None, f"PDF conversion error: {str(e)}"
+    
     def _convert_svg_to_pdf(self, svg_path: Path) -> Tuple[bool, Optional[Path], str]:
         """Convert SVG to PDF using cairosvg"""
         try:
@@ -211,8 +488,17 @@ class TechnicalDrawingGenerator:
             logger.error(f"Error in alternative PDF conversion: {e}")
             return False, None, f"PDF conversion error: {str(e)}"
 
-    def _create_modified_script(self, step_file_path: Path, svg_output_path: Path) -> str:
-        """Create modified FreeCAD script with dynamic paths"""
+    def _create_modified_script(
+        self,
+        step_file_path: Path,
+        svg_output_path: Optional[Path],
+        brep_cache_path: Optional[Path] = None,
+        preview: bool = False
+    ) -> str:
+        """Create modified FreeCAD script with dynamic paths
+        
+        A svg_output_path of None makes the script print the SVG to stdout.
+        """
 
         # Read the base script
         with open(self.base_script_path, 'r', encoding='utf-8') as f:
@@ -220,12 +506,11 @@ class TechnicalDrawingGenerator:
 
         # Get absolute paths
         step_file_str = str(step_file_path.absolute()).replace('\\', '/')
-        svg_output_str = str(svg_output_path.absolute()).replace('\\', '/')
+        svg_output_str = str(svg_output_path.absolute()).replace('\\', '/') if svg_output_path else ""
         template_str = str((self.templates_dir / self.template_name).absolute()).replace('\\', '/')
 
         # Replace the configuration section
         config_replacement = f'''# --- Configuration ---
-script_dir = os.path.dirname(os.path.abspath(__file__))
 step_file_name = "sheet.step"
 output_svg_name = "output.svg"
 template_name = "A4_TOLERY.svg"
@@ -235,17 +520,38 @@ OUTPUT_SVG_PATH = r"{svg_output_str}"
 TEMPLATE_PATH = r"{template_str}"'''
 
         # Find and replace the configuration section
-        import re
-
         # Pattern to match the configuration section
         config_pattern = r'# --- Configuration ---.*?TEMPLATE_PATH = os\.path\.join\(script_dir, "templates", template_name\)'
 
-        modified_script = re.sub(
+        modified_script, count = re.subn(
             config_pattern,
             config_replacement,
             base_script,
             flags=re.DOTALL
         )
+        if count != 1:
+            raise ValueError(f"Configuration section not found in {self.base_script_path}")
+
+        # Render options
+        render_options = {
+            "PREVIEW_MODE": preview,
+            "EDGE_SAMPLES": self.preview_edge_samples if preview else 20,
+            "BREP_CACHE_PATH": str(brep_cache_path.absolute()).replace('\\', '/') if brep_cache_path else None,
+            # Previews only read the geometry cache; writing it is left to the full run
+            "BREP_CACHE_WRITE": not preview,
+            "SVG_BEGIN_MARKER": SVG_BEGIN_MARKER,
+            "SVG_END_MARKER": SVG_END_MARKER,
+        }
+        for name, value in render_options.items():
+            modified_script, count = re.subn(
+                rf'^{name} = .*$',
+                lambda _: f"{name} = {value!r}",
+                modified_script,
+                count=1,
+                flags=re.MULTILINE
+            )
+            if count != 1:
+                raise ValueError(f"Render option {name} not found in {self.base_script_path}")
 
         return modified_script
 
@@ -253,7 +559,8 @@ TEMPLATE_PATH = r"{template_str}"'''
 def generate_technical_drawing_from_step(
     step_file_path: Path,
     output_dir: Path,
-    base_filename: str = None
+    base_filename: str = None,
+    cache_geometry: bool = False
 ) -> Dict[str, Any]:
     """
     Standalone function to generate technical drawing from STEP file
@@ -262,6 +569,7 @@ def generate_technical_drawing_from_step(
         step_file_path: Path to input STEP file
         output_dir: Directory to save output files
         base_filename: Base name for output files
+        cache_geometry: Read and populate the BREP geometry cache
 
     Returns:
         Dictionary with generation results
@@ -269,7 +577,7 @@ def generate_technical_drawing_from_step(
     try:
         generator = TechnicalDrawingGenerator()
         success, svg_path, pdf_path, message = generator.generate_technical_drawing(
-            step_file_path, output_dir, base_filename
+            step_file_path, output_dir, base_filename, cache_geometry
         )
 
         return {
@@ -289,3 +597,76 @@ def generate_technical_drawing_from_step(
             "message": f"Generation failed: {str(e)}",
             "timestamp": datetime.now().isoformat()
         }
+
+
+def generate_technical_drawings_to_archive(
+    step_file_paths: List[Path],
+    archive_path: Path
+) -> Dict[str, Any]:
+    """
+    Generate technical drawings for many STEP files into a single archive
+
+    Parts are named by their path relative to the common directory of all
+    inputs, so files sharing a stem in different folders stay distinct. No
+    files other than the archive are created.
+
+    Args:
+        step_file_paths: Paths to input STEP files
+        archive_path: Output .zip, .tar(.gz), .sqlite/.db file or directory
+
+    Returns:
+        Dictionary with per-part results and the archive index. On failure the
+        archive holds the parts written so far but no index.json.
+    """
+    results = {}
+    sink = None
+    try:
+        generator = TechnicalDrawingGenerator()
+        part_names = _archive_part_names(step_file_paths)
+        with open_output_sink(archive_path) as sink:
+            for step_file_path, part_name in zip(step_file_paths, part_names):
+                success, message = generator.generate_technical_drawing_to_sink(
+                    step_file_path, sink, part_name=part_name
+                )
+                results[part_name] = {"success": success, "message": message}
+
+        return {
+            "success": all(result["success"] for result in results.values()),
+            "archive_path": str(archive_path),
+            "results": results,
+            "index": sink.index,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Error in batch technical drawing generation: {e}")
+        return {
+            "success": False,
+            "archive_path": str(archive_path) if sink is not None else None,
+            "results": results,
+            "index": sink.index if sink is not None else {},
+            "message": f"Generation failed: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def _archive_part_names(step_file_paths: List[Path]) -> List[str]:
+    """Unique part names: paths relative to the inputs' common directory, without suffix"""
+    if not step_file_paths:
+        return []
+
+    resolved = [path.resolve() for path in step_file_paths]
+    common_root = Path(os.path.commonpath([path.parent for path in resolved]))
+
+    part_names = []
+    seen = set()
+    for path in resolved:
+        base_name = path.relative_to(common_root).with_suffix('').as_posix()
+        part_name = base_name
+        counter = 2
+        while part_name in seen:
+            part_name = f"{base_name} ({counter})"
+            counter += 1
+        seen.add(part_name)
+        part_names.append(part_name)
+    return part_names
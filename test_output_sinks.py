@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the output sinks: round trip through each sink and read the index back
+"""
+
+import json
+import sqlite3
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+from output_sinks import INDEX_ENTRY_NAME, open_output_sink
+
+ENTRIES = [
+    ("CAD/SUPPORT 1", "CAD/SUPPORT 1_technical.svg", b"<svg/>"),
+    ("CAD/SUPPORT 1", "CAD/SUPPORT 1_technical.pdf", b"%PDF-1.4"),
+    ("SUPPORT/SUPPORT 1", "SUPPORT/SUPPORT 1_technical.svg", b"<svg></svg>"),
+]
+EXPECTED_INDEX = {
+    "CAD/SUPPORT 1": ["CAD/SUPPORT 1_technical.svg", "CAD/SUPPORT 1_technical.pdf"],
+    "SUPPORT/SUPPORT 1": ["SUPPORT/SUPPORT 1_technical.svg"],
+}
+
+
+def read_back(path: Path):
+    """Return (entries, index) stored by the sink at path"""
+    name = path.name
+    if name.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            entries = {n: archive.read(n) for n in archive.namelist()}
+    elif name.endswith('.tar.gz'):
+        with tarfile.open(path) as archive:
+            entries = {m.name: archive.extractfile(m).read() for m in archive.getmembers()}
+    elif name.endswith('.db'):
+        connection = sqlite3.connect(str(path))
+        try:
+            rows = connection.execute("SELECT name, data FROM entries").fetchall()
+            meta = connection.execute("SELECT value FROM meta WHERE key = 'index'").fetchone()
+        finally:
+            connection.close()
+        return dict(rows), json.loads(meta[0]) if meta else None
+    else:
+        entries = {p.relative_to(path).as_posix(): p.read_bytes() for p in path.rglob('*') if p.is_file()}
+
+    index = json.loads(entries.pop(INDEX_ENTRY_NAME)) if INDEX_ENTRY_NAME in entries else None
+    return entries, index
+
+
+def test_output_sinks():
+    """Write the same entries through every sink and check contents and index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ["drawings.zip", "drawings.tar.gz", "drawings.db", "drawings"]:
+            path = Path(tmp) / name
+            print(f"Testing sink: {name}")
+
+            # Tiny buffer so entries are flushed in several batches
+            with open_output_sink(path, buffer_size=8) as sink:
+                for part_name, entry_name, data in ENTRIES:
+                    sink.write(part_name, entry_name, data)
+
+                try:
+                    sink.write("CAD/SUPPORT 1", "CAD/SUPPORT 1_technical.svg", b"<svg/>")
+                    raise AssertionError("Duplicate entry name was accepted")
+                except ValueError:
+                    pass
+
+            entries, index = read_back(path)
+            assert entries == {entry_name: data for _, entry_name, data in ENTRIES}, entries
+            assert index == EXPECTED_INDEX, index
+            assert sink.index == EXPECTED_INDEX, sink.index
+
+            # A second run that fails keeps its own entries but leaves no index,
+            # not even a stale one from the complete run above
+            try:
+                with open_output_sink(path) as sink:
+                    sink.write("new", "new.svg", b"<svg/>")
+                    raise RuntimeError("batch failed")
+            except RuntimeError:
+                pass
+
+            entries, index = read_back(path)
+            assert index is None, index
+            assert entries["new.svg"] == b"<svg/>", entries
+            if name != "drawings":
+                # Archives and SQLite start empty; a directory keeps older loose files
+                assert entries == {"new.svg": b"<svg/>"}, entries
+
+    print("All output sinks OK")
+
+
+if __name__ == "__main__":
+    test_output_sinks()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the generator parts that do not need FreeCAD: script
+injection, stdout SVG extraction, the preview cache and the stdin bootstrap
+"""
+
+import ast
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+from technical_drawing_generator import (
+    BOOTSTRAP_MARKER,
+    SVG_BEGIN_MARKER,
+    SVG_END_MARKER,
+    TechnicalDrawingGenerator,
+)
+
+STEP_FILE = Path(__file__).parent / "CAD" / "SUPPORT 1.step"
+
+
+def assignments(script: str) -> dict:
+    """Map each top-level `NAME = value` line of the script to its values"""
+    found = {}
+    for match in re.finditer(r'^([A-Z_]+) = (.*)$', script, flags=re.MULTILINE):
+        found.setdefault(match.group(1), []).append(match.group(2))
+    return found
+
+
+def test_modified_script_injection():
+    """Every configuration and render option is set exactly once"""
+    generator = TechnicalDrawingGenerator()
+    cache_path = generator._geometry_cache_path(STEP_FILE)
+
+    for preview in (True, False):
+        script = generator._create_modified_script(STEP_FILE, None, cache_path, preview=preview)
+        compile(script, "run_techdraw_final.py", "exec")
+
+        assert "__file__" not in script
+        assert "script_dir" not in script
+
+        expected = {
+            "STEP_FILE_PATH": str(STEP_FILE.absolute()).replace('\\', '/'),
+            "OUTPUT_SVG_PATH": "",
+            "TEMPLATE_PATH": str((generator.templates_dir / generator.template_name).absolute()).replace('\\', '/'),
+            "PREVIEW_MODE": preview,
+            "EDGE_SAMPLES": generator.preview_edge_samples if preview else 20,
+            "BREP_CACHE_PATH": str(cache_path.absolute()).replace('\\', '/'),
+            "BREP_CACHE_WRITE": not preview,
+            "SVG_BEGIN_MARKER": SVG_BEGIN_MARKER,
+            "SVG_END_MARKER": SVG_END_MARKER,
+        }
+        found = assignments(script)
+        for name, value in expected.items():
+            assert len(found.get(name, [])) == 1, (name, found.get(name))
+            assert ast.literal_eval(found[name][0]) == value, (name, found[name][0])
+
+
+def test_modified_script_missing_option():
+    """A base script without a render option fails loudly instead of silently"""
+    generator = TechnicalDrawingGenerator()
+    base_script = generator.base_script_path.read_text(encoding='utf-8')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        broken_script = Path(tmp) / "run_techdraw_final.py"
+        broken_script.write_text(
+            re.sub(r'^EDGE_SAMPLES = .*\n', '', base_script, flags=re.MULTILINE),
+            encoding='utf-8'
+        )
+        generator.base_script_path = broken_script
+        try:
+            generator._create_modified_script(STEP_FILE, None, preview=True)
+            raise AssertionError("Missing render option was not reported")
+        except ValueError as e:
+            assert "EDGE_SAMPLES" in str(e)
+
+
+def test_extract_svg_from_stdout():
+    """The SVG is pulled out from between FreeCAD's log lines"""
+    generator = TechnicalDrawingGenerator()
+    svg = '<svg xmlns="http://www.w3.org/2000/svg">\n  <g id="TechDrawViews" />\n</svg>'
+    stdout = "\n".join([
+        BOOTSTRAP_MARKER,
+        "STEP file imported successfully.",
+        "Generating top view...",
+        SVG_BEGIN_MARKER,
+        svg,
+        SVG_END_MARKER,
+        "FreeCAD exited normally",
+    ])
+
+    assert generator._extract_svg_from_stdout(stdout) == svg.encode('utf-8')
+    assert generator._extract_svg_from_stdout("Error: STEP file not found") is None
+    assert generator._extract_svg_from_stdout(None) is None
+
+
+def test_preview_cache():
+    """Previews are served from cache and evicted least recently used first"""
+    generator = TechnicalDrawingGenerator()
+    generator.preview_cache_size = 2
+
+    key = generator._geometry_cache_key(STEP_FILE)
+    generator._cache_preview((key, "svg"), b"<svg/>")
+    success, data, message = generator.generate_preview(STEP_FILE)
+    assert success and data == b"<svg/>", message
+
+    generator._cache_preview(("a", "svg"), b"a")
+    generator._get_cached_preview((key, "svg"))
+    generator._cache_preview(("b", "svg"), b"b")
+    assert list(generator._preview_cache) == [(key, "svg"), ("b", "svg")]
+
+
+def test_stdin_bootstrap_fallback():
+    """Scripts run via the stdin bootstrap, or from a file when -c is unsupported"""
+    if os.name != 'posix':
+        print("Skipping bootstrap test: needs a POSIX shell")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Stand-ins for freecadcmd: one runs `-c` like Python, one ignores it
+        supports_c = Path(tmp) / "freecadcmd_c"
+        supports_c.write_text(f'#!/bin/sh\nexec "{sys.executable}" "$@"\n')
+        ignores_c = Path(tmp) / "freecadcmd_no_c"
+        ignores_c.write_text(f'#!/bin/sh\n[ "$1" = "-c" ] && exit 0\nexec "{sys.executable}" "$@"\n')
+        for command in (supports_c, ignores_c):
+            command.chmod(0o755)
+
+        for command, supported in ((supports_c, True), (ignores_c, False)):
+            generator = TechnicalDrawingGenerator()
+            generator.freecad_command = str(command)
+            result = generator._run_freecad_script("print('job output')\n", timeout=30)
+            assert result.returncode == 0, result.stderr
+            assert "job output" in result.stdout, result.stdout
+            assert generator._stdin_bootstrap_supported is supported
+
+
+if __name__ == "__main__":
+    test_modified_script_injection()
+    test_modified_script_missing_option()
+    test_extract_svg_from_stdout()
+    test_preview_cache()
+    test_stdin_bootstrap_fallback()
+    print("All generator checks OK")